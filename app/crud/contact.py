@@ -6,180 +6,175 @@ Implements create, read, update, delete, search, and upcoming birthdays logic.
 from datetime import date, timedelta
 from typing import List, Optional
 
-from fastapi import HTTPException, status
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, lambda_stmt, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.contact import Contact
+from app.models.contact import Contact, birthday_month_day
 from app.schemas.contact import ContactCreate, ContactUpdate
-from app.utils.auth import decode_access_token
 
+# Built once at import so the statement is not reconstructed per call.
+_get_contact_stmt = lambda_stmt(
+    lambda: select(Contact).where(Contact.id == bindparam('cid'), Contact.user_id == bindparam('uid'))
+)
 
-def create_contact(db: Session, contact: ContactCreate, token: str) -> Contact:
+
+async def create_contact(db: AsyncSession, contact: ContactCreate, user_id: int) -> Contact:
     """
     Create a new contact.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         contact (ContactCreate): The contact data to create.
-        token (str): The access token of the user.
+        user_id (int): The ID of the authenticated user.
 
     Returns:
         Contact: The created contact.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
     contact_data = contact.model_dump()
     contact_data.pop("user_id", None)
     db_contact = Contact(**contact_data, user_id=user_id)
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await db.commit()
+    await db.refresh(db_contact)
     return db_contact
 
 
-def get_contacts(db: Session, skip: int = 0, limit: int = 100, token: str = None) -> List[Contact]:
+async def get_contacts(db: AsyncSession, user_id: int, after_id: Optional[int] = None, limit: int = 100) -> List[Contact]:
     """
-    Get a list of contacts.
+    Get a page of contacts ordered by ID (keyset pagination).
 
     Args:
-        db (Session): The database session.
-        skip (int): Number of contacts to skip (for pagination).
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the authenticated user.
+        after_id (Optional[int]): Return contacts with an ID greater than this (the last ID of the previous page).
         limit (int): Maximum number of contacts to return.
-        token (str, optional): The access token of the user.
 
     Returns:
         List[Contact]: A list of contacts.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
-    return db.query(Contact).filter(Contact.user_id == user_id).offset(skip).limit(limit).all()
+    stmt = select(Contact).where(Contact.user_id == user_id)
+    if after_id is not None:
+        stmt = stmt.where(Contact.id > after_id)
+    stmt = stmt.order_by(Contact.id).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
 
 
-def get_contact(db: Session, contact_id: int, token: str = None) -> Optional[Contact]:
+async def get_contact(db: AsyncSession, contact_id: int, user_id: int) -> Optional[Contact]:
     """
     Get a contact by ID.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         contact_id (int): The ID of the contact to retrieve.
-        token (str, optional): The access token of the user.
+        user_id (int): The ID of the authenticated user.
 
     Returns:
         Optional[Contact]: The contact if found, otherwise None.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
-    return db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+    result = await db.execute(_get_contact_stmt, {'cid': contact_id, 'uid': user_id})
+    return result.scalar_one_or_none()
 
 
-def update_contact(db: Session, contact_id: int, contact: ContactUpdate, token: str = None) -> Optional[Contact]:
+async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate, user_id: int) -> Optional[Contact]:
     """
     Update an existing contact.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         contact_id (int): The ID of the contact to update.
         contact (ContactUpdate): The new contact data.
-        token (str, optional): The access token of the user.
+        user_id (int): The ID of the authenticated user.
 
     Returns:
         Optional[Contact]: The updated contact if found and updated, otherwise None.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
-    if db_contact:
-        for key, value in contact.model_dump(exclude_unset=True).items():
-            setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
+    values = contact.model_dump(exclude_unset=True)
+    values.pop("user_id", None)
+    if not values:
+        return await get_contact(db, contact_id, user_id)
+    stmt = (
+        update(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user_id)
+        .values(**values)
+        .returning(Contact)
+    )
+    db_contact = (await db.execute(stmt)).scalar_one_or_none()
+    await db.commit()
     return db_contact
 
 
-def delete_contact(db: Session, contact_id: int, token: str = None) -> bool:
+async def delete_contact(db: AsyncSession, contact_id: int, user_id: int) -> bool:
     """
     Delete a contact.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         contact_id (int): The ID of the contact to delete.
-        token (str, optional): The access token of the user.
+        user_id (int): The ID of the authenticated user.
 
     Returns:
         bool: True if the contact was deleted, otherwise False.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
-    if db_contact:
-        db.delete(db_contact)
-        db.commit()
+    db_contact = await db.get(Contact, contact_id)
+    if db_contact and db_contact.user_id == user_id:
+        await db.delete(db_contact)
+        await db.commit()
         return True
     return False
 
 
-def search_contacts(db: Session, query: str, token: str = None) -> List[Contact]:
+async def search_contacts(db: AsyncSession, query: str, user_id: int, prefix: bool = False) -> List[Contact]:
     """
     Search contacts by first name, last name, or email.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         query (str): The search query.
-        token (str, optional): The access token of the user.
+        user_id (int): The ID of the authenticated user.
+        prefix (bool): Match only values starting with the query. Prefix search
+            uses the lower() btree indexes; substring search relies on the trigram ones.
 
     Returns:
         List[Contact]: A list of contacts matching the search query.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
-    return db.query(Contact).filter(
-        Contact.user_id == user_id,
-        or_(
+    if prefix:
+        # Escape LIKE wildcards so user input cannot unanchor the pattern
+        escaped = query.lower().replace("/", "//").replace("%", "/%").replace("_", "/_")
+        pattern = f"{escaped}%"
+        match = or_(
+            func.lower(Contact.first_name).like(pattern, escape="/"),
+            func.lower(Contact.last_name).like(pattern, escape="/"),
+            func.lower(Contact.email).like(pattern, escape="/"),
+        )
+    else:
+        match = or_(
             Contact.first_name.ilike(f"%{query}%"),
             Contact.last_name.ilike(f"%{query}%"),
             Contact.email.ilike(f"%{query}%"),
         )
-    ).all()
+    stmt = select(Contact).where(Contact.user_id == user_id, match)
+    return (await db.execute(stmt)).scalars().all()
 
 
-def get_upcoming_birthdays(db: Session, token: str = None) -> List[Contact]:
+async def get_upcoming_birthdays(db: AsyncSession, user_id: int) -> List[Contact]:
     """
     Get contacts with upcoming birthdays in the next 7 days.
 
     Args:
-        db (Session): The database session.
-        token (str, optional): The access token of the user.
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the authenticated user.
 
     Returns:
         List[Contact]: A list of contacts with upcoming birthdays.
     """
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("user_id")
     today = date.today()
     next_week = today + timedelta(days=7)
-    contacts = db.query(Contact).filter(Contact.user_id == user_id).all()
-    upcoming: List[Contact] = []
-    for c in contacts:
-        # Normalize birthday to current year
-        bday_this_year = c.birthday.replace(year=today.year)
-        # Handle new year wrap: if already passed, check next year
-        if bday_this_year < today:
-            bday_this_year = c.birthday.replace(year=today.year + 1)
-        if today <= bday_this_year <= next_week:
-            upcoming.append(c)
-    return upcoming
+    today_md = today.month * 100 + today.day
+    end_md = next_week.month * 100 + next_week.day
+    if end_md >= today_md:
+        in_range = birthday_month_day.between(today_md, end_md)
+    else:
+        # Window wraps past December 31st
+        in_range = or_(birthday_month_day >= today_md, birthday_month_day <= end_md)
+    stmt = select(Contact).where(Contact.user_id == user_id, in_range)
+    return (await db.execute(stmt)).scalars().all()
@@ -1,51 +1,90 @@
 """
 CRUD operations for user registration, authentication, email verification, and avatar update.
 """
-from sqlalchemy.orm import Session
+import threading
+from typing import Optional
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from app.models.user import User
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, UserOut
 from app.utils.auth import get_password_hash, verify_password
 
+# Short-lived cache of user profiles served by /me; invalidated whenever a user row changes.
+_user_cache = TTLCache(maxsize=1024, ttl=30)
+# Bumped on every invalidation so a read that raced with an update does not store a stale profile.
+_user_cache_generation = {}
+_user_cache_lock = threading.Lock()
 
-def create_user(db: Session, user: UserCreate):
+
+def _invalidate_user_cache(user_id: int):
+    """Drop a cached user profile."""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+        _user_cache_generation[user_id] = _user_cache_generation.get(user_id, 0) + 1
+
+
+async def create_user(db: AsyncSession, user: UserCreate):
     """Register a new user. Raises 409 if email exists."""
-    if db.query(User).filter(User.email == user.email).first():
+    if (await db.execute(select(User).where(User.email == user.email))).scalar_one_or_none():
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+    # bcrypt is CPU-bound; keep it off the event loop
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=get_password_hash(user.password)
+        hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authenticate user by username and password."""
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if not user or not await run_in_threadpool(verify_password, password, user.hashed_password):
         return None
     return user
 
 
-def verify_user_email(db: Session, user_id: int):
+async def get_user_profile(db: AsyncSession, user_id: int) -> Optional[UserOut]:
+    """Return the user's profile, from cache when possible."""
+    with _user_cache_lock:
+        profile = _user_cache.get(user_id)
+        generation = _user_cache_generation.get(user_id, 0)
+    if profile is not None:
+        return profile
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+    profile = UserOut.model_validate(user)
+    with _user_cache_lock:
+        if _user_cache_generation.get(user_id, 0) == generation:
+            _user_cache[user_id] = profile
+    return profile
+
+
+async def verify_user_email(db: AsyncSession, user_id: int):
     """Mark user email as verified."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if user:
         user.is_verified = True
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        _invalidate_user_cache(user_id)
+        await db.refresh(user)
     return user
 
 
-def update_avatar(db: Session, user_id: int, avatar_url: str):
+async def update_avatar(db: AsyncSession, user_id: int, avatar_url: str):
     """Update user's avatar URL."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if user:
         user.avatar_url = avatar_url
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        _invalidate_user_cache(user_id)
+        await db.refresh(user)
     return user
@@ -3,7 +3,7 @@ SQLAlchemy models for the Contacts REST API.
 Defines the Contact model representing a contact entity in the database.
 """
 
-from sqlalchemy import Column, Date, ForeignKey, Integer, String
+from sqlalchemy import DDL, Column, Date, ForeignKey, Index, Integer, String, cast, event, extract, func, literal_column
 
 from app.database import Base
 
@@ -12,6 +12,11 @@ class Contact(Base):
     """SQLAlchemy model for storing contact information."""
 
     __tablename__ = 'contacts'
+    # Every contact query is scoped by user_id; expression indexes are declared below the class.
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_email', 'user_id', 'email'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
@@ -21,3 +26,36 @@ class Contact(Base):
     birthday = Column(Date, nullable=False)
     extra = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+
+
+# Birthday as an MMDD integer (e.g. 1231). EXTRACT on a date is immutable,
+# so unlike to_char() it can back a functional index. The multiplier is inlined
+# rather than bound so the query expression matches the index under prepared statements.
+birthday_month_day = cast(
+    extract('month', Contact.birthday) * literal_column('100') + extract('day', Contact.birthday),
+    Integer,
+)
+
+Index('ix_contacts_user_bday_md', Contact.user_id, birthday_month_day)
+
+# Trigram indexes let PostgreSQL serve the unanchored ILIKE search without a sequential scan.
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
+Index('ix_contacts_first_name_trgm', Contact.first_name,
+      postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+Index('ix_contacts_last_name_trgm', Contact.last_name,
+      postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+Index('ix_contacts_email_trgm', Contact.email,
+      postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+# lower() btree indexes back the anchored (prefix) search; text_pattern_ops makes LIKE 'q%' indexable.
+Index('ix_contacts_first_name_lower', func.lower(Contact.first_name).label('first_name_lower'),
+      postgresql_ops={'first_name_lower': 'text_pattern_ops'})
+Index('ix_contacts_last_name_lower', func.lower(Contact.last_name).label('last_name_lower'),
+      postgresql_ops={'last_name_lower': 'text_pattern_ops'})
+Index('ix_contacts_email_lower', func.lower(Contact.email).label('email_lower'),
+      postgresql_ops={'email_lower': 'text_pattern_ops'})
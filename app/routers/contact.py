@@ -2,56 +2,55 @@
 FastAPI router for managing contact endpoints.
 Implements RESTful routes for CRUD operations, search, and upcoming birthdays.
 """
-from typing import List
-from fastapi import APIRouter, Depends
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import SessionLocal
 from app.schemas.contact import ContactCreate, ContactUpdate, ContactOut
+from app.utils.auth import get_current_user_id
 from app.crud.contact import create_contact, get_contacts, get_contact, update_contact, delete_contact, search_contacts, get_upcoming_birthdays
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
-def get_db():
+async def get_db():
     """Dependency to get DB session."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 @router.post("/", response_model=ContactOut)
-async def create_contact_route(contact: ContactCreate, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def create_contact_route(contact: ContactCreate, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Create a new contact."""
-    return create_contact(db, contact, token)
+    return await create_contact(db, contact, user_id)
 
 @router.get("/", response_model=List[ContactOut])
-async def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    """Get list of contacts."""
-    return get_contacts(db, skip, limit, token)
+async def read_contacts(after_id: Optional[int] = None, limit: int = Query(100, ge=1, le=500), db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Get list of contacts; pass the last returned ID as after_id to fetch the next page."""
+    return await get_contacts(db, user_id, after_id, limit)
+
+@router.get("/search", response_model=List[ContactOut])
+async def search_contacts_route(query: str, prefix: bool = False, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Search contacts by name or email; set prefix=true for an indexed starts-with match."""
+    return await search_contacts(db, query, user_id, prefix)
 
 @router.get("/{contact_id}", response_model=ContactOut)
-async def read_contact(contact_id: int, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def read_contact(contact_id: int, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Get contact by ID."""
-    return get_contact(db, contact_id, token)
+    return await get_contact(db, contact_id, user_id)
 
 @router.put("/{contact_id}", response_model=ContactOut)
-async def update_contact_route(contact_id: int, contact: ContactUpdate, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def update_contact_route(contact_id: int, contact: ContactUpdate, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Update contact by ID."""
-    return update_contact(db, contact_id, contact, token)
+    return await update_contact(db, contact_id, contact, user_id)
 
 @router.delete("/{contact_id}", response_model=bool)
-async def delete_contact_route(contact_id: int, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def delete_contact_route(contact_id: int, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Delete contact by ID."""
-    return delete_contact(db, contact_id, token)
-
-@router.get("/search", response_model=List[ContactOut])
-async def search_contacts_route(query: str, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    """Search contacts by name or email."""
-    return search_contacts(db, query, token)
+    return await delete_contact(db, contact_id, user_id)
 
 @router.get("/birthdays/upcoming", response_model=List[ContactOut])
-async def upcoming_birthdays_route(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def upcoming_birthdays_route(db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     """Get contacts with upcoming birthdays."""
-    return get_upcoming_birthdays(db, token)
+    return await get_upcoming_birthdays(db, user_id)
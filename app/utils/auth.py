@@ -2,20 +2,54 @@
 Utility functions for password hashing, JWT token creation, and email verification.
 """
 from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
 import os
+import queue
+import threading
+import time
 from typing import Optional
 from email.mime.text import MIMEText
 import smtplib
 
-from passlib.context import CryptContext
+import bcrypt
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from email_validator import validate_email, EmailNotValidError
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASS = os.getenv('SMTP_PASS')
+SMTP_TIMEOUT = 10
+
+# Decoded JWT payloads keyed by a digest of the raw token, so repeat requests
+# skip parsing and signature verification. Invalid tokens are remembered
+# briefly to blunt token spraying.
+_token_cache = TTLCache(maxsize=4096, ttl=30)
+_invalid_token_cache = TTLCache(maxsize=4096, ttl=5)
+_token_cache_lock = threading.Lock()
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
+
+# Shared SMTP connection reused across verification emails; guarded by the lock.
+_smtp: Optional[smtplib.SMTP] = None
+_smtp_lock = threading.Lock()
+
+# Verification emails are sent by one dedicated daemon thread, so SMTP stalls
+# never tie up threadpool workers that serve requests.
+_email_queue: "queue.Queue[tuple[str, int]]" = queue.Queue()
+_email_worker: Optional[threading.Thread] = None
+_email_worker_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
 def verify_password(plain_password, hashed_password):
     """
@@ -28,7 +62,7 @@ def verify_password(plain_password, hashed_password):
     Returns:
         bool: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
 def get_password_hash(password):
@@ -41,7 +75,7 @@ def get_password_hash(password):
     Returns:
         str: The hashed password.
     """
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -62,21 +96,93 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def _token_cache_key(token: str) -> bytes:
+    """Return a short digest of the token so raw tokens are not retained in memory."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
 def decode_access_token(token: str):
     """
     Decode a JWT access token.
 
+    Results are cached for a short time; expiry is still checked on every cache hit.
+
     Args:
         token (str): The JWT token to decode.
 
     Returns:
         dict or None: The decoded payload if valid, None otherwise.
     """
+    if not token:
+        return None
+    key = _token_cache_key(token)
+    with _token_cache_lock:
+        if key in _invalid_token_cache:
+            return None
+        payload = _token_cache.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(key, None)
+        return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
+        with _token_cache_lock:
+            _invalid_token_cache[key] = True
         return None
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
+
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    FastAPI dependency that decodes the access token once per request.
+
+    Declared async so it runs on the event loop: the cached decode is cheap and
+    does not need a threadpool hand-off.
+
+    Args:
+        token (str): The bearer token from the Authorization header.
+
+    Returns:
+        int: The ID of the authenticated user.
+
+    Raises:
+        HTTPException: 401 if the token is invalid or has no user ID.
+    """
+    payload = decode_access_token(token)
+    if not payload or payload.get("user_id") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload["user_id"]
+
+
+def _get_smtp() -> smtplib.SMTP:
+    """Return the shared SMTP connection, connecting and logging in on first use. Caller holds _smtp_lock."""
+    global _smtp
+    if _smtp is None:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            server.starttls()
+            server.login(SMTP_USER, SMTP_PASS)
+        except Exception:
+            server.close()
+            raise
+        _smtp = server
+    return _smtp
+
+
+def _reset_smtp():
+    """Drop the shared SMTP connection so the next send reconnects. Caller holds _smtp_lock."""
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            _smtp.close()
+        _smtp = None
 
 
 def send_verification_email(email: str, user_id: int):
@@ -97,13 +203,49 @@ def send_verification_email(email: str, user_id: int):
     verification_link = f"http://localhost:8000/users/verify/{user_id}"
     msg = MIMEText(f"Please verify your email by clicking the following link: {verification_link}")
     msg['Subject'] = 'Verify your email'
-    msg['From'] = os.getenv('SMTP_USER')
+    msg['From'] = SMTP_USER
     msg['To'] = email
-    try:
-        with smtplib.SMTP(os.getenv('SMTP_HOST'), int(os.getenv('SMTP_PORT'))) as server:
-            server.starttls()
-            server.login(os.getenv('SMTP_USER'), os.getenv('SMTP_PASS'))
-            server.sendmail(msg['From'], [msg['To']], msg.as_string())
-        return True
-    except (smtplib.SMTPException, OSError, ValueError):
-        return False
+    with _smtp_lock:
+        try:
+            try:
+                _get_smtp().sendmail(msg['From'], [msg['To']], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # The server closed an idle connection; reconnect and retry once
+                _reset_smtp()
+                _get_smtp().sendmail(msg['From'], [msg['To']], msg.as_string())
+            return True
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Connection-level failure; reconnect on the next send
+            _reset_smtp()
+            return False
+        except (smtplib.SMTPException, ValueError):
+            # Per-message failure (e.g. refused recipient); the connection stays usable
+            return False
+
+
+def _email_worker_loop():
+    """Send queued verification emails one at a time, forever."""
+    while True:
+        email, user_id = _email_queue.get()
+        try:
+            send_verification_email(email, user_id)
+        except Exception:  # keep the worker alive for the next message
+            logger.exception("Failed to send verification email to user %s", user_id)
+        finally:
+            _email_queue.task_done()
+
+
+def enqueue_verification_email(email: str, user_id: int):
+    """
+    Queue a verification email for the sender thread, starting it on first use.
+
+    Args:
+        email (str): The user's email address.
+        user_id (int): The user's ID.
+    """
+    global _email_worker
+    with _email_worker_lock:
+        if _email_worker is None:
+            _email_worker = threading.Thread(target=_email_worker_loop, name="verification-email", daemon=True)
+            _email_worker.start()
+    _email_queue.put((email, user_id))